@@ -2,12 +2,21 @@
 DocumentAnalyzer - AI-powered legal document analysis
 """
 
+import io
 import os
 import re
+import json
+import math
+import time
+import hashlib
 import logging
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import google.generativeai as genai
-from PIL import Image
-from utils import extract_text_from_pdf, extract_text_from_image, detect_risk_clauses, calculate_complexity_score, calculate_risk_score
+from utils import extract_text_from_pdf, extract_text_from_image, detect_risk_clauses_list, calculate_complexity_score, calculate_risk_score, analyze
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -16,129 +25,666 @@ logger = logging.getLogger(__name__)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 genai.configure(api_key=GEMINI_API_KEY)
 
+# Gemini latency has a long tail; a stuck request would otherwise hold the
+# Flask worker until TCP timeout. Bound every call and retry with backoff.
+GEMINI_REQUEST_TIMEOUT = float(os.getenv("GEMINI_REQUEST_TIMEOUT", "15"))
+GEMINI_REQUEST_RETRIES = int(os.getenv("GEMINI_REQUEST_RETRIES", "2"))
+
+# Shared executor for timed-out calls: abandoned requests finish (or die)
+# here without blocking the caller
+_llm_executor = ThreadPoolExecutor(max_workers=8)
+
+# In-memory cache for LLM responses. Repeat uploads of the same document
+# (or the same question) are common, and each avoided Gemini call saves
+# full network + model latency plus API cost. Bump PROMPT_VERSION when
+# changing any prompt so stale cached responses are not served.
+PROMPT_VERSION = "v1"
+LLM_CACHE_TTL = 7 * 24 * 3600  # 7 days
+LLM_CACHE_MAX_ENTRIES = 512
+_llm_cache = {}
+
+# Fallbacks returned when a Gemini call fails. Module constants so
+# cached_llm_response can recognize them and skip the store: caching one
+# would serve a transient timeout or API error for the whole TTL.
+_SUMMARY_ERROR = "Summary could not be generated due to an error."
+_SIMPLIFY_ERROR = "Text could not be simplified due to an error."
+_TERMS_ERROR = "Terms could not be extracted"
+_ANSWER_ERROR = "I couldn't answer that question due to an error."
+
+def _is_cacheable(result):
+    """True only for successful responses, never error fallbacks"""
+    if result is None:
+        return False
+    if isinstance(result, list):
+        return _TERMS_ERROR not in result
+    return result not in (_SUMMARY_ERROR, _SIMPLIFY_ERROR, _ANSWER_ERROR)
+
+def cached_llm_response(fn):
+    """Cache an LLM method's result keyed by sha256 of its text arguments"""
+    @functools.wraps(fn)
+    def wrapper(self, *args):
+        if not self.model:
+            return fn(self, *args)
+
+        raw_key = "|".join([PROMPT_VERSION, fn.__name__] + [str(a) for a in args])
+        key = hashlib.sha256(raw_key.encode("utf-8", "ignore")).hexdigest()
+
+        cached = _llm_cache.get(key)
+        if cached and cached[1] > time.time():
+            return cached[0]
+
+        result = fn(self, *args)
+        if _is_cacheable(result):
+            # Evict oldest entries to bound memory
+            while len(_llm_cache) >= LLM_CACHE_MAX_ENTRIES:
+                _llm_cache.pop(next(iter(_llm_cache)))
+            _llm_cache[key] = (result, time.time() + LLM_CACHE_TTL)
+        return result
+    return wrapper
+
+# Semantic cache for question answering. Users often ask paraphrased
+# versions of the same question ("What's the termination clause?" vs
+# "How can this be terminated?"); embedding the question and matching on
+# cosine similarity lets those hit the cache without another LLM call.
+# Entries are keyed by a hash of the document text so answers from one
+# document are never served for another.
+EMBEDDING_MODEL = "models/text-embedding-004"
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_MAX_ENTRIES = 256
+_semantic_cache = []  # list of (doc_hash, question_embedding, answer)
+
+def _embed_question(question):
+    """Embed a question for semantic cache lookup; returns None on failure"""
+    try:
+        result = genai.embed_content(model=EMBEDDING_MODEL, content=question)
+        return result["embedding"]
+    except Exception as e:
+        logger.error(f"Question embedding error: {e}")
+        return None
+
+def _cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(x * x for x in b))
+    return dot / norm if norm else 0.0
+
+def _semantic_cache_lookup(doc_hash, embedding):
+    """Return the cached answer for the most similar question, or None"""
+    best_answer, best_score = None, 0.0
+    for cached_hash, cached_embedding, answer in _semantic_cache:
+        if cached_hash != doc_hash:
+            continue
+        score = _cosine_similarity(embedding, cached_embedding)
+        if score > best_score:
+            best_answer, best_score = answer, score
+    if best_score >= SEMANTIC_CACHE_THRESHOLD:
+        return best_answer
+    return None
+
+def _semantic_cache_store(doc_hash, embedding, answer):
+    while len(_semantic_cache) >= SEMANTIC_CACHE_MAX_ENTRIES:
+        _semantic_cache.pop(0)
+    _semantic_cache.append((doc_hash, embedding, answer))
+
+# Questions arriving within this window about the same document are merged
+# into one Gemini call; under concurrent load this turns N calls into 1.
+ASK_BATCH_WINDOW = float(os.getenv("ASK_BATCH_WINDOW", "0.05"))
+
+class _QuestionBatcher:
+    """Micro-batch concurrent questions about the same document.
+
+    The first caller for a document becomes the batch leader: it waits
+    ASK_BATCH_WINDOW seconds for other questions to arrive, then issues a
+    single multi-question prompt and distributes the answers. Followers
+    just wait on their future, so no caller waits longer than the window
+    plus one Gemini round trip.
+    """
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.lock = threading.Lock()
+        self.pending = {}  # doc_hash -> list of (question, Future)
+
+    def ask(self, question, document_text):
+        doc_hash = hashlib.sha256(document_text.encode("utf-8", "ignore")).hexdigest()
+        future = Future()
+        with self.lock:
+            if doc_hash in self.pending:
+                self.pending[doc_hash].append((question, future))
+                leader = False
+            else:
+                self.pending[doc_hash] = [(question, future)]
+                leader = True
+
+        if leader:
+            time.sleep(ASK_BATCH_WINDOW)
+            with self.lock:
+                batch = self.pending.pop(doc_hash)
+            self._run_batch(batch, document_text)
+        return future.result()
+
+    def _run_batch(self, batch, document_text):
+        try:
+            if len(batch) == 1:
+                answers = [self.analyzer.answer_question(batch[0][0], document_text)]
+            else:
+                questions = [question for question, _ in batch]
+                answers = self.analyzer.answer_questions_batch(questions, document_text)
+            for (_, future), answer in zip(batch, answers):
+                future.set_result(answer)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+class _DocumentStore:
+    """LRU store of analyzed document texts keyed by document id.
+
+    A single mutable current_document_text attribute meant concurrent
+    users clobbered each other's documents between /analyze and /ask.
+    Keeping the last N documents keyed by id lets many sessions ask
+    questions at once and revisit earlier uploads without re-analyzing.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self._docs = OrderedDict()
+
+    def put(self, text):
+        """Store a document and return its id"""
+        doc_id = hashlib.sha256(text.encode("utf-8", "ignore")).hexdigest()[:16]
+        with self.lock:
+            self._docs[doc_id] = text
+            self._docs.move_to_end(doc_id)
+            while len(self._docs) > self.maxsize:
+                self._docs.popitem(last=False)
+        return doc_id
+
+    def get(self, doc_id):
+        with self.lock:
+            text = self._docs.get(doc_id)
+            if text is not None:
+                self._docs.move_to_end(doc_id)
+            return text
+
+    def latest(self):
+        """Most recently stored document text, or None"""
+        with self.lock:
+            if not self._docs:
+                return None
+            return self._docs[next(reversed(self._docs))]
+
+# One model instance for the whole process. Each GenerativeModel can
+# allocate its own transport channel and thread pool, so building extras
+# (e.g. a throwaway instance for a connection test) just adds memory and
+# connection churn.
+def _build_model():
+    try:
+        model = genai.GenerativeModel('gemini-1.5-flash')
+        print("✅ Gemini model initialized successfully")
+        return model
+    except Exception as e:
+        print(f"❌ Error initializing Gemini model: {e}")
+        return None
+
+_MODEL = _build_model()
+
+def get_shared_model():
+    """Return the process-wide Gemini model instance (None if init failed)"""
+    return _MODEL
+
 class DocumentAnalyzer:
     def __init__(self):
+        self.documents = _DocumentStore()
+        self.model = _MODEL
+        self._batcher = _QuestionBatcher(self)
+        self._trim_cache = {}  # (text sha256, max_tokens) -> trimmed text
+        if self.model:
+            # Warm the connection off the critical path so the first user
+            # request doesn't pay TLS + HTTP/2 setup and auth exchange
+            threading.Thread(target=self._warmup, daemon=True).start()
+
+    @property
+    def current_document_text(self):
+        """Most recently analyzed document text (kept for back-compat)"""
+        return self.documents.latest()
+
+    def _warmup(self):
+        """Open the API connection with a cheap count_tokens call"""
+        try:
+            self.model.count_tokens("warmup")
+            logger.info("Gemini connection warmed up")
+        except Exception as e:
+            logger.warning(f"Gemini warmup failed: {e}")
+
+    def _generate_with_timeout(self, *args, **kwargs):
+        """Call generate_content with a per-call timeout and bounded retries.
+
+        Cancelling and retrying beats waiting out the p99 tail: the call runs
+        on a shared executor so a hung request never blocks the caller past
+        GEMINI_REQUEST_TIMEOUT seconds.
+        """
+        last_error = None
+        for attempt in range(GEMINI_REQUEST_RETRIES + 1):
+            future = _llm_executor.submit(self.model.generate_content, *args, **kwargs)
+            try:
+                return future.result(timeout=GEMINI_REQUEST_TIMEOUT)
+            except FutureTimeoutError as e:
+                future.cancel()
+                last_error = e
+                logger.warning(f"Gemini request timed out (attempt {attempt + 1})")
+                time.sleep(min(2 ** attempt, 4))  # Exponential backoff
+        raise Exception(f"Gemini request timed out after {GEMINI_REQUEST_RETRIES + 1} attempts") from last_error
+
+    def _trim_to_tokens(self, text, max_tokens):
+        """Trim text to roughly max_tokens using the model's tokenizer.
+
+        Character caps like text[:3000] either waste budget or cut too
+        much depending on the document; counting tokens trims precisely,
+        which lowers both prompt cost and model latency. Results are
+        cached per document so repeated calls (e.g. successive /ask
+        requests) don't re-tokenize.
+        """
+        if not self.model:
+            return text[:max_tokens * 4]  # ~4 chars per token heuristic
+
+        key = (hashlib.sha256(text.encode("utf-8", "ignore")).hexdigest(), max_tokens)
+        cached = self._trim_cache.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            trimmed = text
+            total = self.model.count_tokens(text).total_tokens
+            if total > max_tokens:
+                # Proportional cut, then shave until inside the budget
+                trimmed = text[:max(1, int(len(text) * max_tokens / total))]
+                while self.model.count_tokens(trimmed).total_tokens > max_tokens:
+                    trimmed = trimmed[:int(len(trimmed) * 0.9)]
+        except Exception as e:
+            logger.error(f"Token counting error: {e}")
+            trimmed = text[:max_tokens * 4]
+
+        if len(self._trim_cache) >= 64:
+            self._trim_cache.clear()
+        self._trim_cache[key] = trimmed
+        return trimmed
+
+    @cached_llm_response
+    def generate_analysis_bundle(self, text, ctx=None):
+        """Generate summary, simplified text, and key terms in one Gemini call.
+
+        Issuing a single structured-JSON request instead of three sequential
+        generate_content calls cuts the round trips on the analyze path 3->1.
+        Returns a dict with 'summary', 'simplified_text', and 'key_terms', or
+        None if the call or JSON parsing fails (callers fall back to the
+        individual methods).
+        """
+        if not self.model:
+            return None
+
+        ctx = ctx or self._trim_to_tokens(text, 1000)
+        prompt = f"""Analyze this legal document and respond with a JSON object containing
+        exactly these three fields:
+        - "summary": a brief, clear summary in plain English (max 200 words)
+        - "simplified": the document simplified into plain English anyone can understand
+        - "key_terms": a list of the most important legal terms (max 15)
+
+        Document:
+        {ctx}"""
+
         try:
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            self.current_document_text = None
-            print("✅ Gemini model initialized successfully")
+            response = self._generate_with_timeout(
+                prompt,
+                generation_config={"response_mime_type": "application/json"}
+            )
+            data = json.loads(response.text)
+            terms = data.get("key_terms", [])
+            if not isinstance(terms, list):
+                terms = [str(terms)]
+            return {
+                "summary": str(data.get("summary", "")).strip(),
+                "simplified_text": str(data.get("simplified", "")).strip(),
+                "key_terms": [str(t).strip() for t in terms][:15]
+            }
         except Exception as e:
-            print(f"❌ Error initializing Gemini model: {e}")
-            self.model = None
+            logger.error(f"Bundled analysis error: {e}")
+            return None
 
-    def generate_summary(self, text):
+    @cached_llm_response
+    def generate_summary(self, text, ctx=None):
         """Generate document summary using Gemini"""
         if not self.model:
             return "Summary unavailable - Gemini model not initialized"
 
+        ctx = ctx or self._trim_to_tokens(text, 750)
         prompt = f"""Create a brief, clear summary of this legal document in plain English.
         Focus on the key points, obligations, and important terms. Maximum 200 words.
 
         Document:
-        {text[:3000]}
+        {ctx}
 
         Summary:"""
 
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate_with_timeout(prompt)
             return response.text.strip()
         except Exception as e:
             logger.error(f"Summary generation error: {e}")
-            return "Summary could not be generated due to an error."
+            return _SUMMARY_ERROR
 
-    def simplify_text(self, text):
+    @cached_llm_response
+    def simplify_text(self, text, ctx=None):
         """Simplify legal text to plain English"""
         if not self.model:
             return "Simplified text unavailable - Gemini model not initialized"
 
+        ctx = ctx or self._trim_to_tokens(text, 750)
         prompt = f"""Please simplify the following legal text into plain English that anyone can understand.
         Keep the meaning intact but make it accessible to non-lawyers. Use simple words, shorter sentences,
         and everyday language.
 
         Legal Text:
-        {text[:3000]}
+        {ctx}
 
         Simplified Version:"""
 
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate_with_timeout(prompt)
             return response.text.strip()
         except Exception as e:
             logger.error(f"Text simplification error: {e}")
-            return "Text could not be simplified due to an error."
+            return _SIMPLIFY_ERROR
 
-    def extract_key_terms(self, text):
+    @cached_llm_response
+    def extract_key_terms(self, text, ctx=None):
         """Extract key legal terms"""
         if not self.model:
             return ["Key terms unavailable - Gemini model not initialized"]
 
+        ctx = ctx or self._trim_to_tokens(text, 500)
         prompt = f"""Extract the most important legal terms and concepts from this document.
         Return only a comma-separated list of terms, maximum 15 terms. Focus on key obligations,
         rights, penalties, and important concepts.
 
         Document:
-        {text[:2000]}
+        {ctx}
 
         Key terms:"""
 
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate_with_timeout(prompt)
             terms = [term.strip() for term in response.text.split(',')]
             return terms[:15]
         except Exception as e:
             logger.error(f"Key terms extraction error: {e}")
-            return ["Terms could not be extracted"]
+            return [_TERMS_ERROR]
 
+    @cached_llm_response
     def answer_question(self, question, document_text):
         """Answer questions about the document"""
         if not self.model:
             return "Question answering unavailable - Gemini model not initialized"
 
+        # Check the semantic cache: paraphrases of an already-answered
+        # question about this document skip the Gemini call entirely
+        doc_hash = hashlib.sha256(document_text.encode("utf-8", "ignore")).hexdigest()
+        embedding = _embed_question(question)
+        if embedding:
+            cached_answer = _semantic_cache_lookup(doc_hash, embedding)
+            if cached_answer is not None:
+                return cached_answer
+
         prompt = f"""Based on the following legal document, please answer this question accurately and concisely:
 
         Question: {question}
 
         Document:
-        {document_text[:4000]}
+        {self._trim_to_tokens(document_text, 1000)}
 
         Answer:"""
 
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            response = self._generate_with_timeout(prompt)
+            answer = response.text.strip()
+            if embedding:
+                _semantic_cache_store(doc_hash, embedding, answer)
+            return answer
         except Exception as e:
             logger.error(f"Question answering error: {e}")
-            return "I couldn't answer that question due to an error."
+            return _ANSWER_ERROR
+
+    def answer_question_batched(self, question, document_text):
+        """Answer a question, merging with other concurrent questions.
+
+        Entry point for the /ask endpoint: concurrent questions about the
+        same document within the batching window share one Gemini call.
+        """
+        return self._batcher.ask(question, document_text)
+
+    def answer_questions_batch(self, questions, document_text):
+        """Answer several questions about one document in a single call"""
+        if not self.model:
+            return ["Question answering unavailable - Gemini model not initialized"] * len(questions)
+
+        numbered = "\n".join(f"{i + 1}) {q}" for i, q in enumerate(questions))
+        prompt = f"""Based on the following legal document, answer each numbered question
+        accurately and concisely. Respond with a JSON array of answer strings,
+        one per question, in the same order.
+
+        Questions:
+        {numbered}
+
+        Document:
+        {self._trim_to_tokens(document_text, 1000)}"""
 
-    def analyze_document(self, file_path, filename):
-        """Main analysis function"""
         try:
-            # Extract text based on file type
-            if filename.lower().endswith('.pdf'):
-                text = extract_text_from_pdf(file_path)
-            elif filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                text = extract_text_from_image(file_path, self.model)
-            else:  # Text file
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    text = f.read()
-
-            if not text or len(text.strip()) < 50:
-                raise Exception("Document appears to be empty or too short to analyze")
-
-            self.current_document_text = text
-
-            # Perform analysis
-            word_count = len(text.split())
-            complexity_score = calculate_complexity_score(text)
-            risk_clauses = detect_risk_clauses(text)
+            response = self._generate_with_timeout(
+                prompt,
+                generation_config={"response_mime_type": "application/json"}
+            )
+            answers = [str(a).strip() for a in json.loads(response.text)]
+            if len(answers) != len(questions):
+                raise ValueError("Answer count does not match question count")
+            return answers
+        except Exception as e:
+            logger.error(f"Batched question answering error: {e}")
+            # Fall back to answering individually so one bad parse doesn't
+            # fail the whole batch
+            return [self.answer_question(q, document_text) for q in questions]
+
+    def prefetch_followup_questions(self, question, document_text):
+        """Warm the semantic cache with likely follow-up questions.
+
+        Users asking about a document usually ask several related
+        questions. After answering one, ask Gemini for a few probable
+        follow-ups and answer them in a background thread; answers land in
+        the semantic cache, so when the user's next question matches one
+        it returns with near-zero latency. Runs entirely off the user's
+        critical path.
+        """
+        if not self.model:
+            return
+
+        def worker():
+            try:
+                prompt = f"""A user analyzing this legal document just asked: "{question}"
+                List 3 likely follow-up questions they might ask next.
+                Respond with a JSON array of question strings.
+
+                Document:
+                {self._trim_to_tokens(document_text, 1000)}"""
+
+                response = self._generate_with_timeout(
+                    prompt,
+                    generation_config={"response_mime_type": "application/json"}
+                )
+                followups = [str(q).strip() for q in json.loads(response.text)][:3]
+                for followup in followups:
+                    if followup:
+                        self.answer_question(followup, document_text)
+            except Exception as e:
+                logger.debug(f"Follow-up prefetch failed: {e}")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def answer_question_stream(self, question, document_text):
+        """Yield answer chunks as Gemini generates them.
+
+        Streaming gets first tokens to the client in well under a second
+        instead of blocking until the whole answer is complete. The full
+        answer is stored in the semantic cache once the stream finishes.
+        """
+        if not self.model:
+            yield "Question answering unavailable - Gemini model not initialized"
+            return
+
+        doc_hash = hashlib.sha256(document_text.encode("utf-8", "ignore")).hexdigest()
+        embedding = _embed_question(question)
+        if embedding:
+            cached_answer = _semantic_cache_lookup(doc_hash, embedding)
+            if cached_answer is not None:
+                yield cached_answer
+                return
+
+        prompt = f"""Based on the following legal document, please answer this question accurately and concisely:
+
+        Question: {question}
+
+        Document:
+        {self._trim_to_tokens(document_text, 1000)}
+
+        Answer:"""
+
+        try:
+            parts = []
+            for chunk in self.model.generate_content(prompt, stream=True):
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+            if embedding and parts:
+                _semantic_cache_store(doc_hash, embedding, "".join(parts).strip())
+        except Exception as e:
+            logger.error(f"Streaming answer error: {e}")
+            yield "I couldn't answer that question due to an error."
+
+    def generate_summary_stream(self, text, ctx=None):
+        """Yield summary chunks as Gemini generates them"""
+        if not self.model:
+            yield "Summary unavailable - Gemini model not initialized"
+            return
+
+        ctx = ctx or self._trim_to_tokens(text, 750)
+        prompt = f"""Create a brief, clear summary of this legal document in plain English.
+        Focus on the key points, obligations, and important terms. Maximum 200 words.
+
+        Document:
+        {ctx}
+
+        Summary:"""
+
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True):
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            logger.error(f"Streaming summary error: {e}")
+            yield "Summary could not be generated due to an error."
+
+    def extract_text(self, source, filename):
+        """Extract document text based on file type.
+
+        Accepts either a file path or the raw upload bytes; passing bytes
+        avoids writing the upload to disk just to read it straight back.
+        """
+        is_bytes = isinstance(source, (bytes, bytearray))
+        if filename.lower().endswith('.pdf'):
+            text = extract_text_from_pdf(io.BytesIO(source) if is_bytes else source)
+        elif filename.lower().endswith(('.jpg', '.jpeg', '.png')):
+            text = extract_text_from_image(io.BytesIO(source) if is_bytes else source, self.model)
+        elif is_bytes:  # Text file, in memory
+            text = source.decode('utf-8', errors='ignore')
+        else:  # Text file on disk
+            with open(source, 'r', encoding='utf-8', errors='ignore') as f:
+                text = f.read()
+
+        if not text or len(text.strip()) < 50:
+            raise Exception("Document appears to be empty or too short to analyze")
+        return text
+
+    def analyze_document_stream(self, source, filename):
+        """Streaming variant of analyze_document.
+
+        Yields (event, data) tuples: the deterministic metrics are sent as
+        soon as they are ready, then summary chunks stream as Gemini
+        produces them, then a final event carries the remaining AI fields.
+        This cuts time-to-first-byte from several seconds to well under one.
+        """
+        text = self.extract_text(source, filename)
+        document_id = self.documents.put(text)
+
+        # Precompute the shared text views once; both scorers reuse them
+        analyzed = analyze(text)
+        word_count = analyzed.word_count
+        complexity_score = calculate_complexity_score(analyzed)
+        risk_clauses = detect_risk_clauses_list(analyzed)
+        risk_score = calculate_risk_score(risk_clauses, complexity_score, word_count)
+
+        yield ("metrics", {
+            "document_id": document_id,
+            "word_count": word_count,
+            "complexity_score": complexity_score,
+            "risk_clauses": risk_clauses,
+            "risk_score": risk_score,
+            "original_text": text[:1000] + "..." if len(text) > 1000 else text
+        })
+
+        ctx = self._trim_to_tokens(text, 1000)
+        for chunk in self.generate_summary_stream(text, ctx):
+            yield ("summary_chunk", chunk)
+
+        yield ("complete", {
+            "simplified_text": self.simplify_text(text, ctx),
+            "key_terms": self.extract_key_terms(text, ctx)
+        })
+
+    def analyze_document(self, source, filename):
+        """Main analysis function; accepts a file path or raw upload bytes"""
+        try:
+            text = self.extract_text(source, filename)
+            document_id = self.documents.put(text)
+
+            # Perform analysis; the shared text views are computed once
+            analyzed = analyze(text)
+            word_count = analyzed.word_count
+            complexity_score = calculate_complexity_score(analyzed)
+            risk_clauses = detect_risk_clauses_list(analyzed)
             risk_score = calculate_risk_score(risk_clauses, complexity_score, word_count)
 
-            # Generate AI content
-            summary = self.generate_summary(text)
-            simplified_text = self.simplify_text(text)
-            key_terms = self.extract_key_terms(text)
+            # Trim the prompt context once and share it across every LLM
+            # call for this analysis
+            ctx = self._trim_to_tokens(text, 1000)
+
+            # Generate AI content in a single batched call; fall back to the
+            # individual methods if the structured response fails
+            bundle = self.generate_analysis_bundle(text, ctx)
+            if bundle and bundle["summary"]:
+                summary = bundle["summary"]
+                simplified_text = bundle["simplified_text"]
+                key_terms = bundle["key_terms"]
+            else:
+                # The three calls are independent I/O-bound requests, so run
+                # them in parallel: wall time becomes max() instead of sum()
+                with ThreadPoolExecutor(max_workers=3) as pool:
+                    summary_future = pool.submit(self.generate_summary, text, ctx)
+                    simplified_future = pool.submit(self.simplify_text, text, ctx)
+                    terms_future = pool.submit(self.extract_key_terms, text, ctx)
+                    summary = summary_future.result()
+                    simplified_text = simplified_future.result()
+                    key_terms = terms_future.result()
 
             return {
+                "document_id": document_id,
                 "word_count": word_count,
                 "complexity_score": complexity_score,
                 "risk_clauses": risk_clauses,
@@ -5,13 +5,14 @@ Main Flask Application
 """
 
 import os
+import json
+import hashlib
 import tempfile
 import logging
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, render_template, Response
 from werkzeug.utils import secure_filename
-from analyzer import DocumentAnalyzer
-from utils import install_packages
+from analyzer import DocumentAnalyzer, get_shared_model
 import nest_asyncio
 from pyngrok import ngrok, conf
 from pathlib import Path
@@ -21,6 +22,31 @@ except ImportError:
     print("Warning: flask-cors not installed, CORS might not work properly")
     CORS = None
 
+try:
+    from flask_compress import Compress
+except ImportError:
+    print("Warning: flask-compress not installed, responses will be uncompressed")
+    Compress = None
+
+try:
+    import orjson
+except ImportError:
+    print("Warning: orjson not installed, falling back to stdlib json")
+    orjson = None
+
+def ojsonify(obj, status=200):
+    """Build a JSON response with orjson when available.
+
+    orjson encodes straight to bytes several times faster than the stdlib
+    encoder jsonify uses, which matters for the text-heavy analysis
+    payloads this app returns.
+    """
+    if orjson:
+        body = orjson.dumps(obj)
+    else:
+        body = json.dumps(obj)
+    return Response(body, status=status, mimetype='application/json')
+
 # Import the function to load environment variables
 try:
     from dotenv import load_dotenv
@@ -39,11 +65,21 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 if CORS:
     CORS(app)
+if Compress:
+    # gzip/brotli negotiation via Accept-Encoding; the text-heavy analysis
+    # payloads shrink 3-5x on the wire
+    Compress(app)
 
 # Create the upload folder if it doesn't exist
 UPLOAD_FOLDER = os.path.join(tempfile.gettempdir(), 'snaplaw_uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+
+# On-disk cache of completed analyses keyed by upload content hash, so
+# re-uploading an identical document skips extraction, OCR, and all
+# Gemini calls entirely
+ANALYSIS_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'cache')
+os.makedirs(ANALYSIS_CACHE_FOLDER, exist_ok=True)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
 # Get API keys and tokens from environment variables
@@ -58,51 +94,117 @@ def index():
     """Serve the main HTML interface"""
     return render_template('index.html')
 
+def _filter_analysis_fields(analysis):
+    """Trim the analysis to the fields the client asked for (?fields=a,b).
+
+    Mobile clients that only need e.g. summary and risk_score can skip
+    downloading the full simplified text and original-text preview.
+    """
+    fields = request.args.get('fields')
+    if not fields:
+        return analysis
+    wanted = {f.strip() for f in fields.split(',') if f.strip()}
+    if not wanted:
+        return analysis
+    return {k: v for k, v in analysis.items() if k in wanted}
+
 @app.route('/analyze', methods=['POST'])
 def analyze_document():
     """Handle document upload and analysis"""
     try:
         if 'file' not in request.files:
-            return jsonify({"success": False, "error": "No file uploaded"})
+            return ojsonify({"success": False, "error": "No file uploaded"})
 
         file = request.files['file']
         if file.filename == '':
-            return jsonify({"success": False, "error": "No file selected"})
+            return ojsonify({"success": False, "error": "No file selected"})
 
         # Validate file type
         allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png', '.txt'}
         file_ext = os.path.splitext(file.filename.lower())[1]
         if file_ext not in allowed_extensions:
-            return jsonify({"success": False, "error": "Unsupported file type"})
-
-        # Save uploaded file
+            return ojsonify({"success": False, "error": "Unsupported file type"})
+
+        # Hash the upload to check the analysis cache before doing any work
+        file_bytes = file.read()
+        content_hash = hashlib.sha256(file_bytes).hexdigest()
+        analysis_cache_path = os.path.join(ANALYSIS_CACHE_FOLDER, f"{content_hash}.json")
+        text_cache_path = os.path.join(ANALYSIS_CACHE_FOLDER, f"{content_hash}.txt")
+
+        if os.path.exists(analysis_cache_path):
+            # Only serve the cached analysis when the extracted text is
+            # also cached: without it /ask would reject the returned
+            # document_id forever, and re-analyzing would keep hitting the
+            # same stale entry. Drop the orphaned json and re-analyze.
+            if os.path.exists(text_cache_path):
+                with open(analysis_cache_path, 'r', encoding='utf-8') as f:
+                    analysis = json.load(f)
+                # Restore the document text so /ask keeps working
+                with open(text_cache_path, 'r', encoding='utf-8') as f:
+                    doc_id = analyzer.documents.put(f.read())
+                analysis["document_id"] = doc_id
+                # Streaming clients must get SSE even on a cache hit, or
+                # an identical re-upload breaks their event parser; replay
+                # the cached analysis through the same event protocol
+                if request.args.get('stream') == '1':
+                    def cached_stream(analysis=analysis):
+                        metrics = {k: analysis[k] for k in
+                                   ('document_id', 'word_count', 'complexity_score',
+                                    'risk_clauses', 'risk_score', 'original_text')
+                                   if k in analysis}
+                        yield f"data: {json.dumps({'event': 'metrics', 'data': metrics})}\n\n"
+                        if analysis.get('summary'):
+                            yield f"data: {json.dumps({'event': 'summary_chunk', 'data': analysis['summary']})}\n\n"
+                        complete = {'simplified_text': analysis.get('simplified_text'),
+                                    'key_terms': analysis.get('key_terms')}
+                        yield f"data: {json.dumps({'event': 'complete', 'data': complete})}\n\n"
+                    return Response(cached_stream(), mimetype='text/event-stream')
+                return ojsonify({"success": True, "analysis": _filter_analysis_fields(analysis), "cached": True})
+            try:
+                os.remove(analysis_cache_path)
+            except OSError:
+                pass
+
+        # The upload bytes are already in memory for hashing, so analyze
+        # them directly instead of writing to disk and re-reading
         filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{filename}"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
 
+        # Streaming mode: send deterministic metrics immediately, then
+        # stream the AI-generated sections as server-sent events
+        if request.args.get('stream') == '1':
+            def event_stream():
+                try:
+                    for event, data in analyzer.analyze_document_stream(file_bytes, filename):
+                        yield f"data: {json.dumps({'event': event, 'data': data})}\n\n"
+                except Exception as stream_error:
+                    logger.error(f"Streaming analysis error: {stream_error}")
+                    yield f"data: {json.dumps({'event': 'error', 'data': str(stream_error)})}\n\n"
+            return Response(event_stream(), mimetype='text/event-stream')
+
+        # Analyze the document
+        analysis = analyzer.analyze_document(file_bytes, filename)
+
+        # Cache the analysis and extracted text for identical re-uploads
         try:
-            # Analyze the document
-            analysis = analyzer.analyze_document(file_path, filename)
-
-            # Clean up uploaded file
-            os.remove(file_path)
-
-            return jsonify({
-                "success": True,
-                "analysis": analysis
-            })
-
-        except Exception as analysis_error:
-            # Clean up uploaded file on error
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            raise analysis_error
+            with open(analysis_cache_path, 'w', encoding='utf-8') as f:
+                json.dump(analysis, f)
+            # Look the text up by this analysis' id: current_document_text
+            # is whatever any session stored last, so under concurrent
+            # uploads it could cache another user's document under this
+            # upload's content hash
+            with open(text_cache_path, 'w', encoding='utf-8') as f:
+                f.write(analyzer.documents.get(analysis["document_id"]) or "")
+        except OSError as cache_error:
+            logger.warning(f"Could not write analysis cache: {cache_error}")
+
+        return ojsonify({
+            "success": True,
+            "analysis": _filter_analysis_fields(analysis)
+        })
 
     except Exception as e:
         logger.error(f"Analysis endpoint error: {e}")
-        return jsonify({
+        return ojsonify({
             "success": False,
             "error": str(e)
         })
@@ -111,25 +213,54 @@ def analyze_document():
 def ask_question():
     """Handle question answering"""
     try:
-        data = request.get_json()
+        if orjson:
+            data = orjson.loads(request.get_data()) or {}
+        else:
+            data = request.get_json() or {}
         question = data.get('question', '').strip()
 
         if not question:
-            return jsonify({"success": False, "error": "No question provided"})
-
-        if not analyzer.current_document_text:
-            return jsonify({"success": False, "error": "No document analyzed yet"})
-
-        answer = analyzer.answer_question(question, analyzer.current_document_text)
-
-        return jsonify({
+            return ojsonify({"success": False, "error": "No question provided"})
+
+        # Look up the caller's document by id so concurrent sessions don't
+        # clobber each other; fall back to the most recent document for
+        # older clients that don't send one
+        document_id = data.get('document_id')
+        if document_id:
+            document_text = analyzer.documents.get(document_id)
+            if not document_text:
+                return ojsonify({"success": False, "error": "Unknown document_id - please re-analyze the document"})
+        else:
+            document_text = analyzer.current_document_text
+
+        if not document_text:
+            return ojsonify({"success": False, "error": "No document analyzed yet"})
+
+        # Streaming mode: push answer chunks as server-sent events so the
+        # first tokens arrive without waiting for the full generation
+        if data.get('stream'):
+            def event_stream():
+                try:
+                    for chunk in analyzer.answer_question_stream(question, document_text):
+                        yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+                except Exception as stream_error:
+                    logger.error(f"Streaming answer error: {stream_error}")
+                    yield f"data: {json.dumps({'error': str(stream_error)})}\n\n"
+            return Response(event_stream(), mimetype='text/event-stream')
+
+        answer = analyzer.answer_question_batched(question, document_text)
+
+        # Warm the semantic cache with likely follow-ups off the critical path
+        analyzer.prefetch_followup_questions(question, document_text)
+
+        return ojsonify({
             "success": True,
             "answer": answer
         })
 
     except Exception as e:
         logger.error(f"Question answering error: {e}")
-        return jsonify({
+        return ojsonify({
             "success": False,
             "error": str(e)
         })
@@ -137,7 +268,7 @@ def ask_question():
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return ojsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "api_configured": bool(GEMINI_API_KEY and analyzer.model),
@@ -146,11 +277,11 @@ def health_check():
 
 @app.errorhandler(413)
 def too_large(e):
-    return jsonify({"success": False, "error": "File too large. Maximum size is 16MB."}), 413
+    return ojsonify({"success": False, "error": "File too large. Maximum size is 16MB."}, status=413)
 
 @app.errorhandler(500)
 def internal_error(e):
-    return jsonify({"success": False, "error": "Internal server error"}), 500
+    return ojsonify({"success": False, "error": "Internal server error"}, status=500)
 
 def setup_ngrok():
     """Setup ngrok with authentication"""
@@ -204,8 +335,40 @@ def run_with_ngrok():
         print("🔄 Trying local hosting as fallback...")
         run_local()
 
+def run_production():
+    """Run the app under gunicorn with gevent workers.
+
+    Flask's built-in server ties up one OS thread per in-flight request,
+    and most of our request time is spent waiting on multi-second Gemini
+    calls. gevent workers multiplex those I/O waits, so hundreds of LLM
+    requests can be in flight per process instead of a handful.
+    """
+    import sys
+    import subprocess
+    workers = os.getenv("SNAPLAW_WORKERS", "4")
+    connections = os.getenv("SNAPLAW_WORKER_CONNECTIONS", "200")
+    try:
+        print(f"🚀 Starting gunicorn with {workers} gevent workers")
+        subprocess.check_call([
+            sys.executable, "-m", "gunicorn",
+            "-k", "gevent",
+            "-w", workers,
+            "--worker-connections", connections,
+            "-b", "0.0.0.0:5000",
+            "app:app"
+        ])
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        # Run the built-in server directly rather than via run_local,
+        # which would see SNAPLAW_PRODUCTION=1 and recurse back here
+        print(f"❌ Could not start gunicorn ({e}), falling back to built-in server")
+        print("🏠 Running locally at: http://127.0.0.1:5000")
+        app.run(host='127.0.0.1', port=5000, debug=False, threaded=True)
+
 def run_local():
     """Run Flask app locally without ngrok"""
+    if os.getenv("SNAPLAW_PRODUCTION") == "1":
+        run_production()
+        return
     try:
         print("🏠 Running locally at: http://127.0.0.1:5000")
         print("📝 Note: Only accessible from this machine")
@@ -220,9 +383,9 @@ def main():
     print("📍 Optimized for Local Development")
     print("=" * 60)
 
-    # Install packages first
-    print("📦 Installing required packages...")
-    install_packages()
+    # Dependencies are expected to be installed ahead of time
+    # (pip install -r requirements.txt); installing at startup blocked the
+    # port from opening for tens of seconds on every launch
 
     # Check API configuration
     if not GEMINI_API_KEY or GEMINI_API_KEY.strip() == "" or "YOUR_API_KEY" in GEMINI_API_KEY:
@@ -234,17 +397,21 @@ def main():
     print(f"✅ Gemini API configured")
     print(f"📁 Upload folder: {app.config['UPLOAD_FOLDER']}")
 
-    # Test Gemini connection
-    import google.generativeai as genai
-    genai.configure(api_key=GEMINI_API_KEY)
-    try:
-        test_model = genai.GenerativeModel('gemini-1.5-flash')
-        test_response = test_model.generate_content("Test connection")
-        print("✅ Gemini API connection successful")
-    except Exception as e:
-        print(f"❌ Gemini API connection failed: {e}")
-        print("🔧 Please check your API key and internet connection")
-        return
+    # Test Gemini connection using the shared model instance rather than
+    # building a throwaway one with its own connection pool. count_tokens
+    # validates auth and connectivity without paying for a generation;
+    # set WARMUP=0 to skip the check entirely.
+    if os.getenv("WARMUP", "1") != "0":
+        try:
+            test_model = get_shared_model()
+            if test_model is None:
+                raise Exception("Gemini model failed to initialize")
+            test_model.count_tokens("Test connection")
+            print("✅ Gemini API connection successful")
+        except Exception as e:
+            print(f"❌ Gemini API connection failed: {e}")
+            print("🔧 Please check your API key and internet connection")
+            return
 
     # Test ngrok token
     if not NGROK_AUTH_TOKEN or "YOUR_TOKEN" in NGROK_AUTH_TOKEN:
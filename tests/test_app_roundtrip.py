@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Integration tests for the /analyze -> /ask document_id round trip
+"""
+
+import unittest
+import io
+import os
+import sys
+import json
+import uuid
+from unittest.mock import MagicMock
+
+# Add the parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Mock dependencies before importing
+sys.modules['google.generativeai'] = MagicMock()
+sys.modules['PIL'] = MagicMock()
+sys.modules['PyPDF2'] = MagicMock()
+sys.modules['nest_asyncio'] = MagicMock()
+sys.modules['pyngrok'] = MagicMock()
+
+# Import after mocking
+import app as app_module
+from app import app
+
+
+class TestDocumentRoundTrip(unittest.TestCase):
+    """Test that /analyze hands out a document_id that /ask accepts"""
+
+    def setUp(self):
+        """Set up test client with Gemini disabled (deterministic fallbacks)"""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        app_module.analyzer.model = None
+
+    def _analyze_text(self, text):
+        """Upload a text document and return the parsed response"""
+        response = self.client.post('/analyze', data={
+            'file': (io.BytesIO(text.encode('utf-8')), 'contract.txt')
+        })
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def _sample_document(self):
+        # Unique per run so the on-disk analysis cache never interferes
+        return f"""
+        Contract {uuid.uuid4()}: this agreement contains a binding arbitration
+        clause. All payments are non-refundable. We may terminate this
+        agreement at any time without notice to you.
+        """
+
+    def test_analyze_returns_document_id(self):
+        """The analysis payload carries a document_id for /ask"""
+        data = self._analyze_text(self._sample_document())
+
+        self.assertTrue(data['success'])
+        self.assertIn('document_id', data['analysis'])
+        self.assertTrue(data['analysis']['document_id'])
+
+    def test_ask_round_trip_with_document_id(self):
+        """A document_id from /analyze is accepted by /ask"""
+        data = self._analyze_text(self._sample_document())
+        document_id = data['analysis']['document_id']
+
+        response = self.client.post('/ask',
+                                    data=json.dumps({
+                                        'question': 'Can I get a refund?',
+                                        'document_id': document_id
+                                    }),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        answer_data = json.loads(response.data)
+        self.assertTrue(answer_data['success'])
+        self.assertIn('answer', answer_data)
+
+    def test_ask_rejects_unknown_document_id(self):
+        """An unknown document_id gets a re-analyze error, not a wrong doc"""
+        response = self.client.post('/ask',
+                                    data=json.dumps({
+                                        'question': 'Can I get a refund?',
+                                        'document_id': 'not-a-real-id'
+                                    }),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(response.data)
+        self.assertFalse(data['success'])
+        self.assertIn('re-analyze', data['error'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
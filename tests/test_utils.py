@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Unit tests for SnapLaw risk detection and scoring utilities
+"""
+
+import unittest
+import os
+import sys
+import types
+
+# Add the parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import (
+    RISK_PATTERNS, analyze, detect_risk_clauses, detect_risk_clauses_list,
+    calculate_complexity_score, _analysis_cache
+)
+
+
+class TestRiskDetection(unittest.TestCase):
+    """Test cases for risk clause detection"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        _analysis_cache.clear()
+        self.sample_text = """
+        This agreement contains a binding arbitration clause and mandatory arbitration terms.
+        All payments are non-refundable under any circumstances.
+        We may terminate this agreement at any time without notice to you.
+        Your data will be shared with third parties for marketing purposes.
+        """
+
+    def test_detect_risk_clauses_is_generator(self):
+        """detect_risk_clauses yields risks lazily"""
+        result = detect_risk_clauses(self.sample_text)
+        self.assertIsInstance(result, types.GeneratorType)
+
+        first = next(result)
+        for key in ('text', 'type', 'severity', 'explanation'):
+            self.assertIn(key, first)
+
+    def test_detect_risk_clauses_list_matches_generator(self):
+        """The list wrapper materializes exactly what the generator yields"""
+        expected = list(detect_risk_clauses(self.sample_text))
+        self.assertEqual(detect_risk_clauses_list(self.sample_text), expected)
+        # A second (cached) call must return the same list, not an
+        # exhausted iterator
+        self.assertEqual(detect_risk_clauses_list(self.sample_text), expected)
+
+    def test_one_clause_per_risk_type(self):
+        """Multiple matching patterns of one risk type yield a single entry"""
+        risks = detect_risk_clauses_list(self.sample_text)
+        risk_types = [risk['type'] for risk in risks]
+
+        self.assertEqual(len(risk_types), len(set(risk_types)))
+        self.assertIn('Binding Arbitration', risk_types)
+        self.assertIn('Non-refundable', risk_types)
+
+    def test_detect_risk_clauses_accepts_analyzed_text(self):
+        """Detection gives the same results for raw text and AnalyzedText"""
+        from_text = detect_risk_clauses_list(self.sample_text)
+        _analysis_cache.clear()
+        from_analyzed = detect_risk_clauses_list(analyze(self.sample_text))
+        self.assertEqual(from_text, from_analyzed)
+
+    def test_risk_patterns_have_combined_regex(self):
+        """Every risk type carries its compiled combined alternation"""
+        for risk_key, risk_info in RISK_PATTERNS.items():
+            self.assertIn('combined', risk_info,
+                          f"Missing combined regex in pattern '{risk_key}'")
+
+    def test_complexity_score_accepts_analyzed_text(self):
+        """Scoring gives the same result for raw text and AnalyzedText"""
+        text = "Whereas the party shall indemnify. This is a breach of covenant."
+        from_text = calculate_complexity_score(text)
+        _analysis_cache.clear()
+        from_analyzed = calculate_complexity_score(analyze(text))
+        self.assertEqual(from_text, from_analyzed)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)